@@ -12,7 +12,7 @@ Visão Geral do Protocolo MissionLink:
 - Não trata timeouts ou retransmissões automaticamente (deve ser feito no nível superior).
 
 Estrutura do Header (20 bytes, big-endian):
-    - version: uint8 (versão do protocolo, atualmente 1)
+    - version: uint8 (versão do protocolo: 1, ou 2 com PROGRESS v2; ver VERSION_PROGRESS_V2)
     - msg_type: uint8 (tipo de mensagem, ex.: READY=0, MISSION=1)
     - flags: uint8 (bitmask para flags como NEEDS_ACK, ACK_ONLY, RETX)
     - hdr_len: uint8 (tamanho do header, sempre 20)
@@ -39,10 +39,11 @@ Flags:
 Este módulo fornece funções para construir, parsear e validar mensagens ML.
 """
 
+import functools
 import struct
 import zlib
 from dataclasses import dataclass
-from typing import Tuple, Dict, Any
+from typing import Optional, Tuple, NamedTuple
 
 # ==========================
 # Constantes de protocolo
@@ -51,6 +52,12 @@ from typing import Tuple, Dict, Any
 # Versão do protocolo MissionLink
 VERSION = 1
 
+# Versão 2: igual à 1, mais o PROGRESS v2 (x/y quantizados). Negociada no READY/MISSION:
+# o rover anuncia-a no header do READY, a Nave-Mãe aceita-a respondendo com a MISSION
+# nessa versão, e só então o rover envia PROGRESS v2 (com version=2 no header).
+# Uma Nave-Mãe só com a versão 1 responde com version=1 e continua a receber PROGRESS v1.
+VERSION_PROGRESS_V2 = 2
+
 # Formato do header em struct.pack (big endian / network order)
 # !      -> network (= big endian)
 # B B B B -> version, msg_type, flags, hdr_len (1 byte cada)
@@ -59,6 +66,7 @@ VERSION = 1
 # I       -> checksum (4 bytes, uint32)
 HEADER_FORMAT = "!BBBBIIHHI"
 HEADER_SIZE = struct.calcsize(HEADER_FORMAT)  # header tem tamanho fixo de 20 bytes
+_HEADER_STRUCT = struct.Struct(HEADER_FORMAT)  # pré-compilado: evita reinterpretar o formato por mensagem
 
 # Tipos de mensagem (msg_type)
 TYPE_READY = 0          # Rover solicita missão
@@ -114,8 +122,7 @@ def encode_header(h: MLHeader) -> bytes:
     Retorna:
         bytes: Header codificado em 20 bytes.
     """
-    return struct.pack(
-        HEADER_FORMAT,
+    return _HEADER_STRUCT.pack(
         h.version,
         h.msg_type,
         h.flags,
@@ -143,20 +150,8 @@ def decode_header(data: bytes) -> MLHeader:
     if len(data) < HEADER_SIZE:
         raise ValueError(f"Dados insuficientes para header ML (len={len(data)})")
 
-    version, msg_type, flags, hdr_len, seq, ack, stream_id, payload_len, checksum = \
-        struct.unpack(HEADER_FORMAT, data[:HEADER_SIZE])
-
-    return MLHeader(
-        version=version,
-        msg_type=msg_type,
-        flags=flags,
-        hdr_len=hdr_len,
-        seq=seq,
-        ack=ack,
-        stream_id=stream_id,
-        payload_len=payload_len,
-        checksum=checksum,
-    )
+    # unpack_from lê só os primeiros HEADER_SIZE bytes, sem copiar data[:HEADER_SIZE]
+    return MLHeader(*_HEADER_STRUCT.unpack_from(data))
 
 # ==========================
 # Checksum
@@ -174,7 +169,7 @@ def compute_checksum(payload: bytes) -> int:
     """
     if not payload:
         return 0
-    return zlib.crc32(payload) & 0xFFFFFFFF
+    return zlib.crc32(payload)  # em Python 3 já é unsigned, sem & 0xFFFFFFFF
 
 # ==========================
 # Construção / parsing de mensagens completas
@@ -207,19 +202,9 @@ def build_message(
     payload_len = len(payload)
     checksum = compute_checksum(payload)
 
-    header = MLHeader(
-        version=version,
-        msg_type=msg_type,
-        flags=flags,
-        hdr_len=HEADER_SIZE,
-        seq=seq,
-        ack=ack,
-        stream_id=stream_id,
-        payload_len=payload_len,
-        checksum=checksum,
-    )
-
-    return encode_header(header) + payload
+    return _HEADER_STRUCT.pack(
+        version, msg_type, flags, HEADER_SIZE, seq, ack, stream_id, payload_len, checksum
+    ) + payload
 
 def parse_message(data: bytes) -> Tuple[MLHeader, bytes]:
     """
@@ -239,7 +224,7 @@ def parse_message(data: bytes) -> Tuple[MLHeader, bytes]:
     if len(data) < HEADER_SIZE:
         raise ValueError("Mensagem demasiado curta (sem header completo)")
 
-    header = decode_header(data[:HEADER_SIZE])
+    header = decode_header(data)
     payload = data[HEADER_SIZE:HEADER_SIZE + header.payload_len]
 
     if len(payload) != header.payload_len:
@@ -253,10 +238,89 @@ def parse_message(data: bytes) -> Tuple[MLHeader, bytes]:
 
     return header, payload
 
+# Mensagens sem payload (ACK, NOMISSION): para um dado tipo/flags, só seq, ack e
+# stream_id mudam, e estão seguidos no header (offsets 4..13). Em vez de construir
+# a mensagem de raiz, o chamador guarda um template e reescreve só esses campos.
+_SEQ_ACK_SID_STRUCT = struct.Struct("!IIH")
+_SEQ_ACK_SID_OFFSET = 4
+
+def build_template(msg_type: int, flags: int = 0, version: int = VERSION) -> bytearray:
+    """
+    Constrói uma mensagem sem payload com seq/ack/stream_id a zero, para usar com patch_template.
+
+    Parâmetros:
+        msg_type (int): Tipo de mensagem (ex.: TYPE_ACK).
+        flags (int): Flags da mensagem (bitmask de FLAG_*).
+        version (int): Versão do protocolo (padrão: VERSION).
+
+    Retorna:
+        bytearray: Mensagem de HEADER_SIZE bytes (payload_len=0, checksum=0).
+    """
+    return bytearray(build_message(msg_type, 0, 0, 0, b"", flags, version))
+
+def patch_template(
+    buf: bytearray, seq: int, ack: int, stream_id: int, version: Optional[int] = None,
+    _pack_into=_SEQ_ACK_SID_STRUCT.pack_into, _off=_SEQ_ACK_SID_OFFSET,
+) -> bytearray:
+    """
+    Reescreve seq, ack e stream_id de um template criado por build_template.
+
+    Também serve para qualquer mensagem completa já construída (ex.: uma MISSION
+    fixa): o checksum cobre só o payload, por isso continua válido.
+
+    Parâmetros:
+        buf (bytearray): Template a alterar (no próprio sítio).
+        seq (int): Número de sequência desta mensagem.
+        ack (int): Número de sequência sendo confirmado.
+        stream_id (int): ID do rover/stream.
+        version (Optional[int]): Se indicada, reescreve também a versão do header.
+
+    Retorna:
+        bytearray: O próprio buf, pronto a enviar.
+    """
+    if version is not None:
+        buf[0] = version  # version é o primeiro byte do header
+    _pack_into(buf, _off, seq, ack, stream_id)
+    return buf
+
 # ==========================
 # Payloads específicos: MISSION, PROGRESS, DONE
 # ==========================
 
+class PayloadSizeError(ValueError):
+    """
+    Payload com tamanho diferente do esperado para o tipo de mensagem.
+
+    A mensagem de erro só é formatada quando a exceção é convertida em texto,
+    para que frames malformados que são apenas descartados custem pouco.
+
+    Atributos:
+        tipo (str): Nome do payload (ex.: "MISSION").
+        expected (int | tuple): Tamanho(s) aceite(s) em bytes.
+        actual (int): Tamanho recebido em bytes.
+    """
+
+    def __init__(self, tipo: str, expected, actual: int):
+        super().__init__(tipo, expected, actual)
+        self.tipo = tipo
+        self.expected = expected
+        self.actual = actual
+
+    def __str__(self) -> str:
+        esperado = self.expected
+        if isinstance(esperado, tuple):
+            esperado = " ou ".join(map(str, esperado))
+        return f"Payload {self.tipo} com tamanho inválido (esperado={esperado}, real={self.actual})"
+
+# Os parsers "unchecked" são memoizados pelos bytes do payload: retransmissões
+# UDP entregam exatamente os mesmos bytes e devolvem o mesmo NamedTuple (imutável).
+# Só payloads do tipo bytes passam pela cache; outros buffers (bytearray,
+# memoryview) são mutáveis/não hashable e são decodificados diretamente.
+# Os parsers públicos aceitam cache=False para contornar a cache.
+# O Struct e o construtor do NamedTuple entram como argumentos por omissão
+# para serem lidos como variáveis locais em vez de globais + atributo.
+PARSE_CACHE_SIZE = 1024
+
 # Formatos binários para os payloads
 
 # ---- MISSION ----
@@ -268,6 +332,23 @@ def parse_message(data: bytes) -> Tuple[MLHeader, bytes]:
 # duracao    : float32
 MISSION_FORMAT = "!BHffff"  # B=uint8, H=uint16, f=float32
 MISSION_SIZE = struct.calcsize(MISSION_FORMAT)
+_MISSION_STRUCT = struct.Struct(MISSION_FORMAT)
+
+class MissionPayload(NamedTuple):
+    """Payload MISSION decodificado."""
+    mission_id: int
+    task_number: int
+    x: float
+    y: float
+    radius: float
+    duracao: float
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_mission_unchecked(
+    buf: bytes, _unpack=_MISSION_STRUCT.unpack, _make=MissionPayload._make
+) -> MissionPayload:
+    """Decodifica um payload MISSION sem validar o tamanho (parse_payload_mission já o garantiu)."""
+    return _make(_unpack(buf))
 
 def build_payload_mission(
     mission_id: int,
@@ -291,35 +372,73 @@ def build_payload_mission(
     Retorna:
         bytes: Payload codificado.
     """
-    return struct.pack(MISSION_FORMAT, mission_id, task_number, x, y, radius, duracao)
+    return _MISSION_STRUCT.pack(mission_id, task_number, x, y, radius, duracao)
 
-def parse_payload_mission(payload: bytes) -> Dict[str, Any]:
+def parse_payload_mission(payload: bytes, cache: bool = True) -> MissionPayload:
     """
-    Decodifica payload de MISSION para um dicionário.
+    Decodifica payload de MISSION.
 
     Parâmetros:
         payload (bytes): Payload binário.
+        cache (bool): Reutiliza o resultado de payloads iguais já vistos
+            (só se aplica a payloads do tipo bytes).
 
     Retorna:
-        Dict[str, Any]: Dicionário com chaves 'mission_id', 'task_number', 'x', 'y', 'radius', 'duracao'.
+        MissionPayload: Campos 'mission_id', 'task_number', 'x', 'y', 'radius', 'duracao'.
 
     Levanta:
-        ValueError: Se o tamanho não corresponder.
+        PayloadSizeError: Se o tamanho não corresponder (subclasse de ValueError).
     """
     if len(payload) != MISSION_SIZE:
-        raise ValueError(
-            f"Payload MISSION com tamanho inválido "
-            f"(esperado={MISSION_SIZE}, real={len(payload)})"
-        )
-    mission_id, task_number, x, y, radius, duracao = struct.unpack(MISSION_FORMAT, payload)
-    return {
-        "mission_id": mission_id,
-        "task_number": task_number,
-        "x": x,
-        "y": y,
-        "radius": radius,
-        "duracao": duracao,
-    }
+        raise PayloadSizeError("MISSION", MISSION_SIZE, len(payload))
+    if not cache or type(payload) is not bytes:
+        return _parse_mission_unchecked.__wrapped__(payload)
+    return _parse_mission_unchecked(payload)
+
+# Header + payload MISSION num único Struct. O checksum só é conhecido depois
+# de o payload estar escrito, por isso é preenchido no fim sobre o mesmo buffer.
+_HDR_MISSION_STRUCT = struct.Struct("!" + HEADER_FORMAT.lstrip("!") + MISSION_FORMAT.lstrip("!"))
+_CHECKSUM_STRUCT = struct.Struct("!I")
+_CHECKSUM_OFFSET = HEADER_SIZE - _CHECKSUM_STRUCT.size
+
+def build_frame_mission(
+    seq: int,
+    ack: int,
+    stream_id: int,
+    mission_id: int,
+    task_number: int,
+    x: float,
+    y: float,
+    radius: float,
+    duracao: float,
+    flags: int = 0,
+    version: int = VERSION,
+) -> bytes:
+    """
+    Constrói uma mensagem MISSION completa (header + payload) de uma só vez.
+
+    Equivalente a build_message(TYPE_MISSION, ..., payload=build_payload_mission(...)),
+    mas sem o payload intermédio nem a concatenação header + payload.
+
+    Parâmetros:
+        seq (int): Número de sequência desta mensagem.
+        ack (int): Número de sequência sendo confirmado (0 se não aplicável).
+        stream_id (int): ID do rover/stream.
+        mission_id, task_number, x, y, radius, duracao: Campos da MISSION.
+        flags (int): Flags da mensagem (bitmask de FLAG_*).
+        version (int): Versão do protocolo (padrão: VERSION).
+
+    Retorna:
+        bytes: Mensagem completa codificada.
+    """
+    buf = bytearray(_HDR_MISSION_STRUCT.size)
+    _HDR_MISSION_STRUCT.pack_into(
+        buf, 0,
+        version, TYPE_MISSION, flags, HEADER_SIZE, seq, ack, stream_id, MISSION_SIZE, 0,
+        mission_id, task_number, x, y, radius, duracao,
+    )
+    _CHECKSUM_STRUCT.pack_into(buf, _CHECKSUM_OFFSET, compute_checksum(memoryview(buf)[HEADER_SIZE:]))
+    return bytes(buf)
 
 # ---- PROGRESS ----
 # mission_id: uint8
@@ -330,6 +449,45 @@ def parse_payload_mission(payload: bytes) -> Dict[str, Any]:
 # y         : float32
 PROGRESS_FORMAT = "!BBBBff"
 PROGRESS_SIZE = struct.calcsize(PROGRESS_FORMAT)
+_PROGRESS_STRUCT = struct.Struct(PROGRESS_FORMAT)
+
+# ---- PROGRESS v2 (posição quantizada) ----
+# Igual ao PROGRESS, mas x/y em uint16 de vírgula fixa sobre [0, MAX_ARENA_XY].
+# Tem 8 bytes em vez de 12, por isso o tamanho do payload identifica o formato.
+PROGRESS_FORMAT_V2 = "!BBBBHH"
+PROGRESS_SIZE_V2 = struct.calcsize(PROGRESS_FORMAT_V2)
+_PROGRESS_STRUCT_V2 = struct.Struct(PROGRESS_FORMAT_V2)
+MAX_ARENA_XY = 255.0  # mesmo limite das posições no TelemetryStream (1 byte)
+XY_SCALE = 65535.0 / MAX_ARENA_XY
+
+class ProgressPayload(NamedTuple):
+    """Payload PROGRESS decodificado."""
+    mission_id: int
+    status: int
+    percent: int
+    battery: int
+    x: float
+    y: float
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_progress_unchecked(
+    buf: bytes, _unpack=_PROGRESS_STRUCT.unpack, _make=ProgressPayload._make
+) -> ProgressPayload:
+    """Decodifica um payload PROGRESS sem validar o tamanho (parse_payload_progress já o garantiu)."""
+    return _make(_unpack(buf))
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_progress_v2_unchecked(
+    buf: bytes, _unpack=_PROGRESS_STRUCT_V2.unpack, _scale=XY_SCALE
+) -> ProgressPayload:
+    """Decodifica um payload PROGRESS v2 sem validar o tamanho (parse_payload_progress já o garantiu)."""
+    mission_id, status, percent, battery, x_q, y_q = _unpack(buf)
+    return ProgressPayload(mission_id, status, percent, battery, x_q / _scale, y_q / _scale)
+
+def _quantizar_xy(v: float) -> int:
+    """Converte uma coordenada para uint16 de vírgula fixa (com saturação)."""
+    q = round(v * XY_SCALE)
+    return 0 if q < 0 else (65535 if q > 65535 else q)
 
 def build_payload_progress(
     mission_id: int,
@@ -353,41 +511,75 @@ def build_payload_progress(
     Retorna:
         bytes: Payload codificado.
     """
-    return struct.pack(PROGRESS_FORMAT, mission_id, status, percent, battery, x, y)
+    return _PROGRESS_STRUCT.pack(mission_id, status, percent, battery, x, y)
+
+def build_payload_progress_v2(
+    mission_id: int,
+    status: int,
+    percent: int,
+    battery: int,
+    x: float,
+    y: float,
+) -> bytes:
+    """
+    Constrói payload binário de PROGRESS v2 (x/y quantizados em uint16).
+
+    A resolução é MAX_ARENA_XY / 65535 (~0.004 unidades); valores fora de
+    [0, MAX_ARENA_XY] saturam nos limites.
 
-def parse_payload_progress(payload: bytes) -> Dict[str, Any]:
+    Parâmetros:
+        Iguais a build_payload_progress.
+
+    Retorna:
+        bytes: Payload codificado (PROGRESS_SIZE_V2 bytes).
     """
-    Decodifica payload de PROGRESS para um dicionário.
+    return _PROGRESS_STRUCT_V2.pack(
+        mission_id, status, percent, battery, _quantizar_xy(x), _quantizar_xy(y)
+    )
+
+def parse_payload_progress(payload: bytes, cache: bool = True) -> ProgressPayload:
+    """
+    Decodifica payload de PROGRESS (v1 ou v2, distinguidos pelo tamanho).
 
     Parâmetros:
         payload (bytes): Payload binário.
+        cache (bool): Reutiliza o resultado de payloads iguais já vistos
+            (só se aplica a payloads do tipo bytes).
 
     Retorna:
-        Dict[str, Any]: Dicionário com chaves 'mission_id', 'status', 'percent', 'battery', 'x', 'y'.
+        ProgressPayload: Campos 'mission_id', 'status', 'percent', 'battery', 'x', 'y'.
 
     Levanta:
-        ValueError: Se o tamanho não corresponder.
+        PayloadSizeError: Se o tamanho não corresponder (subclasse de ValueError).
     """
-    if len(payload) != PROGRESS_SIZE:
-        raise ValueError(
-            f"Payload PROGRESS com tamanho inválido "
-            f"(esperado={PROGRESS_SIZE}, real={len(payload)})"
-        )
-    mission_id, status, percent, battery, x, y = struct.unpack(PROGRESS_FORMAT, payload)
-    return {
-        "mission_id": mission_id,
-        "status": status,
-        "percent": percent,
-        "battery": battery,
-        "x": x,
-        "y": y,
-    }
+    n = len(payload)
+    if n == PROGRESS_SIZE:
+        parse = _parse_progress_unchecked
+    elif n == PROGRESS_SIZE_V2:
+        parse = _parse_progress_v2_unchecked
+    else:
+        raise PayloadSizeError("PROGRESS", (PROGRESS_SIZE, PROGRESS_SIZE_V2), n)
+    if not cache or type(payload) is not bytes:
+        return parse.__wrapped__(payload)
+    return parse(payload)
 
 # ---- DONE ----
 # mission_id : uint8
 # result_code: uint8 (0=OK, 1=ABORT, 2=ERROR, ...)
 DONE_FORMAT = "!BB"
-DONE_SIZE = struct.calcsize(DONE_FORMAT)
+DONE_SIZE = struct.calcsize(DONE_FORMAT)  # "!BB" são só dois bytes crus: dispensa o struct
+
+# Todos os payloads DONE com result_code < DONE_CACHE_CODES, pré-construídos
+# (256 * 16 objetos bytes imutáveis, partilháveis sem cópia).
+DONE_CACHE_CODES = 16
+_DONE_CACHE = tuple(
+    tuple(bytes((m, r)) for r in range(DONE_CACHE_CODES)) for m in range(256)
+)
+
+class DonePayload(NamedTuple):
+    """Payload DONE decodificado."""
+    mission_id: int
+    result_code: int
 
 def build_payload_done(
     mission_id: int,
@@ -403,31 +595,31 @@ def build_payload_done(
     Retorna:
         bytes: Payload codificado.
     """
-    return struct.pack(DONE_FORMAT, mission_id, result_code)
-
-def parse_payload_done(payload: bytes) -> Dict[str, Any]:
+    if mission_id >= 0 and result_code >= 0:
+        try:
+            return _DONE_CACHE[mission_id][result_code]
+        except IndexError:
+            pass
+    return bytes((mission_id, result_code))
+
+def parse_payload_done(payload: bytes) -> DonePayload:
     """
-    Decodifica payload de DONE para um dicionário.
+    Decodifica payload de DONE.
+
+    Sem cache: ler dois bytes custa menos do que a consulta à lru_cache.
 
     Parâmetros:
         payload (bytes): Payload binário.
 
     Retorna:
-        Dict[str, Any]: Dicionário com chaves 'mission_id', 'result_code'.
+        DonePayload: Campos 'mission_id', 'result_code'.
 
     Levanta:
-        ValueError: Se o tamanho não corresponder.
+        PayloadSizeError: Se o tamanho não corresponder (subclasse de ValueError).
     """
     if len(payload) != DONE_SIZE:
-        raise ValueError(
-            f"Payload DONE com tamanho inválido "
-            f"(esperado={DONE_SIZE}, real={len(payload)})"
-        )
-    mission_id, result_code = struct.unpack(DONE_FORMAT, payload)
-    return {
-        "mission_id": mission_id,
-        "result_code": result_code,
-    }
+        raise PayloadSizeError("DONE", DONE_SIZE, len(payload))
+    return DonePayload(payload[0], payload[1])
 
 # ==========================
 # Helpers
@@ -443,5 +635,9 @@ def is_flag_set(flags: int, flag: int) -> bool:
 
     Retorna:
         bool: True se o flag estiver definido, False caso contrário.
+
+    Nota:
+        Mantida por compatibilidade. Em caminhos quentes testar diretamente
+        `flags & FLAG_X`, que evita o custo da chamada de função.
     """
     return (flags & flag) != 0
\ No newline at end of file
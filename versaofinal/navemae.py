@@ -10,7 +10,8 @@ Visão Geral:
   - Gerencia missões via MissionLink (UDP): atribui missões, processa progresso e conclusão.
   - Oferece interface WebSocket para Ground Control (GC): recebe comandos manuais e envia updates de rovers.
   - Suporta cenários de missões (1-4): finitos ou infinitos, com geração automática ou manual.
-- Threads: Usa múltiplas threads para telemetria, MissionLink e WebSocket, garantindo operação concorrente.
+- Concorrência: telemetria (TCP) e MissionLink (UDP) correm num único event loop asyncio, numa thread
+  própria; o servidor WebSocket e o envio para o GC usam threads.
 - Cenários:
   - 1: Uma missão finita.
   - 2: Duas missões finitas.
@@ -22,6 +23,7 @@ Dependências:
 - missionlink: Para protocolo MissionLink.
 - roverINFO: Para representar rovers.
 - websocket_server: Para servidor WebSocket.
+- orjson (opcional): Serialização JSON das mensagens do GC; sem ele usa-se o módulo json.
 - utils: Funções auxiliares (não usado diretamente aqui).
 
 Uso:
@@ -29,8 +31,11 @@ Uso:
 - Número de rovers é fixo em 3 (pode ser parametrizado).
 """
 
+import asyncio
+import os
 import socket
 import threading
+from collections import deque
 from typing import Optional, Tuple
 
 import ts
@@ -40,12 +45,111 @@ from roverINFO import Rover
 
 from websocket_server import WebsocketServer
 import json
+import logging
 import time
 import argparse
 import random
 
+try:
+    import orjson
+except ImportError:  # orjson é opcional: usa-se o json da biblioteca padrão
+    orjson = None
+
+if orjson is not None:
+    def _json_dumps(obj) -> str:
+        """Serializa obj para texto JSON (orjson devolve bytes UTF-8)."""
+        return orjson.dumps(obj).decode()
+
+    _json_loads = orjson.loads
+else:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
+# Mensagens por pacote (READY, PROGRESS, ACK, frames INFO) vão para log.debug, com
+# argumentos %-style: com o nível acima de DEBUG nem sequer são formatadas.
+log = logging.getLogger("navemae")
+
 contador = 0  # Contador global (aparentemente não usado; pode ser removido)
 
+# Coordenada máxima (x e y) dos destinos das missões geradas automaticamente.
+# Os rovers reportam a posição em PROGRESS v2 (negociado no READY, ver
+# ml.VERSION_PROGRESS_V2), que satura em ml.MAX_ARENA_XY:
+# destinos acima desse limite seriam reportados errados sem qualquer aviso.
+ARENA_XY_MAX = 15
+assert ARENA_XY_MAX <= ml.MAX_ARENA_XY, "ARENA_XY_MAX excede o alcance do PROGRESS v2"
+
+class _TSProtocolo(asyncio.BufferedProtocol):
+    """
+    Protocolo asyncio de uma ligação TelemetryStream (TCP).
+
+    O event loop faz recv_into diretamente para um buffer pré-alocado por ligação,
+    lendo de uma vez tudo o que o kernel tiver (até receive_chunk bytes). Cada leitura
+    é seguida da extração de todos os frames completos; os bytes de um frame
+    incompleto são movidos para o início do buffer e completados na leitura seguinte.
+    Os frames são decodificados a partir de memoryviews desse buffer, sem cópias.
+    """
+
+    MAX_FRAME = ts.HEADER_SIZE + 255  # payload_len ocupa 1 byte no header TS
+    receive_chunk = 16384  # bytes lidos por chamada (análogo a remoted.receive_chunk)
+
+    def __init__(self, nave: "NaveMae"):
+        self.nave = nave
+        self.buf = bytearray(max(self.receive_chunk, self.MAX_FRAME))
+        self.view = memoryview(self.buf)
+        self.fim = 0  # bytes válidos no buffer
+        self.transport: Optional[asyncio.Transport] = None
+        self.addr = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.addr = transport.get_extra_info("peername")
+        self.nave._clientes_ts.add(transport)
+        print(f"[NaveMae] ligação de {self.addr}")
+
+    def get_buffer(self, sizehint: int):
+        return self.view[self.fim:]
+
+    def buffer_updated(self, nbytes: int):
+        fim = self.fim + nbytes
+        view = self.view
+        h = ts.HEADER_SIZE
+        pos = 0
+        try:
+            while fim - pos >= h:
+                # Header lido uma só vez: None enquanto o payload não chegou todo
+                frame = ts.decodificarFrameEm(view, pos, fim)
+                if frame is None:
+                    break
+                pos += h + frame.header.payload_len
+                self.nave._imprimir(frame, self.addr)
+        except Exception as exc:
+            print(f"[NaveMae] erro {self.addr}: {exc}")
+            self.transport.close()
+            return
+        if pos:
+            # Move o frame incompleto (se existir) para o início do buffer
+            resto = fim - pos
+            self.buf[:resto] = self.buf[pos:fim]
+            fim = resto
+        self.fim = fim
+
+    def connection_lost(self, exc):
+        self.nave._clientes_ts.discard(self.transport)
+        print(f"[NaveMae] ligação terminada {self.addr}")
+
+class _MLProtocolo(asyncio.DatagramProtocol):
+    """Protocolo asyncio do socket MissionLink: entrega cada datagrama à NaveMae."""
+
+    def __init__(self, nave: "NaveMae"):
+        self.nave = nave
+
+    def datagram_received(self, data: bytes, addr):
+        self.nave._processarML(data, addr)
+
+    def error_received(self, exc: Exception):
+        # Erros de envio/receção do socket UDP (ex.: ICMP port unreachable de um rover que saiu)
+        log.warning("[NaveMae/ML] erro no socket MissionLink: %s", exc)
+
 class NaveMae:
     """
     Classe principal da Nave-Mãe.
@@ -55,16 +159,18 @@ class NaveMae:
     Atributos:
         host (str): Host para escuta (TCP, UDP, WS).
         port (int): Porto TCP para telemetria.
-        tarefas (list): Lista de missões automáticas (para cenários finitos).
+        tarefas (deque): Fila de missões automáticas (para cenários finitos).
         scenario (int): Cenário atual (1-4).
         task_counter (int): Contador para missões infinitas (cenário 3).
-        manual_missions (dict): Missões manuais por rover (rover_id -> list[tuple]).
+        manual_missions (dict): Missões manuais por rover (rover_id -> deque[tuple]).
         manual_task_counter (int): Contador para IDs únicos de missões manuais.
         servidorSocket: Socket TCP para telemetria.
         terminar (bool): Flag para parar threads.
         ml_port (int): Porto UDP para MissionLink.
         ml_sock: Socket UDP para MissionLink.
-        ml_thread: Thread para loop MissionLink.
+        ml_transport: Transporte asyncio sobre ml_sock (usado para enviar).
+        loop: Event loop asyncio que serve a telemetria e o MissionLink.
+        loop_thread: Thread onde corre o event loop.
         ml_seq (int): Sequência global para MissionLink.
         ws_server: Servidor WebSocket para GC.
         ws_client: Cliente WebSocket conectado (único).
@@ -75,6 +181,9 @@ class NaveMae:
         rovers (list[Rover]): Lista de instâncias Rover.
     """
 
+    WS_INTERVALO_MIN = 1.0  # segundos mínimos entre dois updates enviados ao GC
+    ACK_COALESCE_WINDOW = 0.005  # segundos durante os quais os ACKs de PROGRESS são agrupados
+
     def __init__(self, roversN: int, host: str = "0.0.0.0", port: int = 6000):
         """
         Inicializa a Nave-Mãe.
@@ -88,27 +197,44 @@ class NaveMae:
         self.port = port
 
         # ---------- Lista de tarefas ----------
-        self.tarefas = []  # Missões automáticas
+        self.tarefas = deque()  # Missões automáticas (FIFO)
+        self._mission_frames = {}  # missão fixa -> frame MISSION pré-construído (ver _preconstruirMissoes)
         self.scenario = 3  # Cenário padrão
         self.task_counter = 0  # Para cenário infinito
-        self.manual_missions = {}  # rover_id -> list[tuple(mission_id, task_id, x, y, radius, duracao)]
+        self.manual_missions = {}  # rover_id -> deque[tuple(mission_id, task_id, x, y, radius, duracao)]
         self.manual_task_counter = 1000  # IDs únicos para manuais
 
         # ---------- Telemetria (TCP) ----------
         self.servidorSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.servidorSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Frames TS são pequenos: sem Nagle (herdado pelas ligações aceites; o asyncio também o ativa)
+        self.servidorSocket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         self.terminar = False
 
         # ---------- Mission Link (UDP) ----------
         self.ml_port = 50000  # Porto UDP para ML
         self.ml_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.ml_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.ml_thread: Optional[threading.Thread] = None
+        self.ml_transport: Optional[asyncio.DatagramTransport] = None
         self.ml_seq = 1  # Sequência global
+        # Mensagens sem payload pré-construídas; por envio só se reescreve seq/ack/stream_id.
+        # O transporte copia os bytes se tiver de adiar o envio, por isso o template pode ser reutilizado.
+        self._ack_template = ml.build_template(ml.TYPE_ACK, ml.FLAG_ACK_ONLY)
+        self._nomission_template = ml.build_template(ml.TYPE_NOMISSION, ml.FLAG_NEEDS_ACK)
+        self._pending_ack = {}  # stream_id -> (seq, addr) do ACK de PROGRESS por enviar
+        self._flush_agendado = False
+
+        # ---------- Event loop (TCP + UDP) ----------
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread: Optional[threading.Thread] = None
+        self._evento_parar: Optional[asyncio.Event] = None
+        self._clientes_ts = set()  # Transportes das ligações TS abertas
+        self.cpus = None  # CPUs onde fixar a thread do event loop (None = deixa o SO decidir)
 
         # ---------- Ground Control WebSockets (GC) ----------
         self.ws_server: WebsocketServer | None = None
         self.ws_client = None  # Um único cliente
+        self._evento_dirty = threading.Event()  # sinalizado quando há rovers dirty para enviar
 
         # Estado do rover por stream_id
         self.ml_estado = {}
@@ -116,6 +242,14 @@ class NaveMae:
         # MISSION pendente por rover: enquanto não houver ACK, reenvia
         self.ml_pending_mission = {}  # stream_id -> {"mission_seq": int, "reply_bytes": bytes, "missao": tuple|None}
 
+        # Handler por msg_type; todos recebem (stream_id, header, payload, addr)
+        self._ml_dispatch = {
+            ml.TYPE_READY: self._ml_handle_ready,
+            ml.TYPE_PROGRESS: self._ml_handle_progress,
+            ml.TYPE_DONE: self._ml_handle_done,
+            ml.TYPE_ACK: self._ml_handle_ack,
+        }
+
         self.nRovers = roversN
         self.rovers = [Rover(id=i) for i in range(roversN)]  # IDs 0-based
 
@@ -127,6 +261,45 @@ class NaveMae:
         self.ml_seq += 1
         return s
 
+    def _ml_agendar_ack(self, stream_id: int, seq: int, addr):
+        """
+        Agenda o ACK de um PROGRESS em vez de o enviar logo.
+
+        Os ACKs pedidos durante uma janela de ACK_COALESCE_WINDOW segundos são agrupados
+        por rover: só é enviado um ACK por stream_id, para o maior seq visto nessa janela.
+        Como o rover espera pelo ACK de cada PROGRESS antes de enviar o seguinte, esse é o
+        seq que ele aguarda; retransmissões dentro da janela deixam de gerar ACKs repetidos.
+        """
+        anterior = self._pending_ack.get(stream_id)
+        if anterior is None or seq > anterior[0]:
+            self._pending_ack[stream_id] = (seq, addr)
+        if not self._flush_agendado:
+            self._flush_agendado = True
+            self.loop.call_later(self.ACK_COALESCE_WINDOW, self._flush_acks)
+
+    def _flush_acks(self):
+        """Envia os ACKs agrupados por _ml_agendar_ack (um por rover)."""
+        self._flush_agendado = False
+        pendentes, self._pending_ack = self._pending_ack, {}
+        for stream_id, (seq, addr) in pendentes.items():
+            self._ml_enviar_ack(stream_id, seq, addr)
+
+    def _ml_send(self, msg, addr):
+        """
+        Envia uma mensagem MissionLink pelo transporte asyncio.
+
+        Não precisa de try/except: se o socket não aceitar já o datagrama (EAGAIN) o
+        transporte guarda-o e reenvia quando puder, e os restantes erros de envio chegam
+        a _MLProtocolo.error_received, que os regista.
+        """
+        self.ml_transport.sendto(msg, addr)
+
+    def _ml_enviar_ack(self, stream_id: int, ack_seq: int, addr):
+        """Envia um ACK (ACK_ONLY) reescrevendo só seq/ack/stream_id do template pré-construído."""
+        self._ml_send(
+            ml.patch_template(self._ack_template, self._prox_seq_ml(), ack_seq, stream_id), addr
+        )
+
     # ================== WEBSOCKET (GROUND CONTROL) ==================
 
     def start_ws_server(self, host: str = "0.0.0.0", port: int = 2900):
@@ -156,6 +329,7 @@ class NaveMae:
         """Callback para novo cliente WebSocket."""
         print("[NaveMae] Ground Control ligado:", client)
         self.ws_client = client  # Só um cliente
+        self._evento_dirty.set()  # envia já o estado pendente
 
     def _ws_cliente_saiu(self, client, server):
         """Callback para cliente WebSocket desconectado."""
@@ -170,7 +344,7 @@ class NaveMae:
         Espera JSON com "type": "assign_mission".
         """
         try:
-            data = json.loads(message)
+            data = _json_loads(message)
         except Exception:
             print("[NaveMae] WS: JSON inválido:", message)
             return
@@ -189,43 +363,54 @@ class NaveMae:
         except Exception as e:
             print("[NaveMae] WS: payload inválido:", e, data)
             return
+        if not (0 <= x <= ml.MAX_ARENA_XY and 0 <= y <= ml.MAX_ARENA_XY):
+            # O PROGRESS v2 do rover não consegue representar posições fora deste intervalo
+            print(f"[NaveMae] WS: destino fora da arena (0..{ml.MAX_ARENA_XY:g}):", data)
+            return
 
         # task_id único
         self.manual_task_counter += 1
         task_id = self.manual_task_counter
 
         missao = (mission_id, task_id, x, y, radius, duracao)
-        self.manual_missions.setdefault(rover_id, []).append(missao)
+        self.manual_missions.setdefault(rover_id, deque()).append(missao)
 
         print(f"[NaveMae] WS: missão manual enfileirada para rover {rover_id}: {missao}")
 
     def _ws_loop_envio(self):
-        """Loop para enviar updates de rovers via WebSocket."""
+        """
+        Loop para enviar updates de rovers via WebSocket.
+
+        Dorme até _evento_dirty ser sinalizado (um rover mudou ou o GC ligou-se), em vez de
+        acordar todos os segundos. Depois de cada envio espera WS_INTERVALO_MIN segundos, para
+        agrupar as alterações seguintes numa só mensagem.
+        """
         while not self.terminar:
+            if not self._evento_dirty.wait(timeout=5.0):
+                continue
+            self._evento_dirty.clear()
             self._enviar_dirty_rovers()
-            time.sleep(1)
+            time.sleep(self.WS_INTERVALO_MIN)
 
     def _enviar_dirty_rovers(self):
         """Envia dados de rovers 'dirty' (modificados) para GC."""
         if not self.ws_server or not self.ws_client:
             return
-        ficheiro = [r.to_dict() for r in self.rovers if r.dirty]
+        # Uma só passagem: serializa e limpa a flag apenas dos rovers dirty
+        ficheiro = []
+        for r in self.rovers:
+            if r.dirty:
+                r.dirty = False
+                ficheiro.append(r.to_dict())
         if not ficheiro:
-            print("[NaveMae] Nenhum rover dirty, nada para enviar")
             return
 
-        # Limpa flag dirty
-        for r in self.rovers:
-            r.dirty = False
-
-        msg = json.dumps({"type": "rovers_update", "data": ficheiro})
+        msg = _json_dumps({"type": "rovers_update", "data": ficheiro})
         try:
             self.ws_server.send_message(self.ws_client, msg)
         except Exception as e:
             print("[NaveMae] Erro a enviar WebSocket:", e)
             self.ws_client = None
-        finally:
-            print("Enviei JSON")
 
     def criaTarefa(self, task_id: int):
         """
@@ -234,11 +419,15 @@ class NaveMae:
         Retorna:
             tuple: (mission_id, task_id, x, y, radius, duracao)
         """
-        mission_id = random.randint(1, 6)
-        x = random.randint(0, 15)
-        y = random.randint(0, 15)
+        # random.random() + int() em vez de randint: cada randint passa por
+        # randrange/_randbelow em Python; a distribuição é a mesma (inteiros uniformes).
+        rand = random.random
+        mission_id = 1 + int(rand() * 6)                  # 1..6
+        x = int(rand() * (ARENA_XY_MAX + 1))              # 0..ARENA_XY_MAX
+        y = int(rand() * (ARENA_XY_MAX + 1))
         radius = 2.0
-        duracao = random.randint(30, 60) if random.randint(1, 3) == 1 else random.randint(45, 60)
+        # 1 em 3: 30..60 s, senão 45..60 s
+        duracao = 30 + int(rand() * 31) if rand() < 1 / 3 else 45 + int(rand() * 16)
         return (mission_id, task_id, x, y, radius, duracao)
 
     # ================== MissionLink handlers ==================
@@ -249,31 +438,26 @@ class NaveMae:
 
         Retorna True se duplicada.
         """
-        last = self.ml_last_seq.get(stream_id)
-        if last is None:
-            self.ml_last_seq[stream_id] = header.seq
-            return False
-        if header.seq > last:
-            self.ml_last_seq[stream_id] = header.seq
+        seq = header.seq
+        last = self.ml_last_seq.get(stream_id, -1)  # -1: qualquer seq (uint32) é nova
+        if seq > last:
+            self.ml_last_seq[stream_id] = seq
             return False
-        return header.seq == last
+        return seq == last
 
-    def _ml_handle_ready(self, stream_id: int, header: ml.MLHeader, addr):
+    def _ml_handle_ready(self, stream_id: int, header: ml.MLHeader, payload: bytes, addr):
         """
         Processa mensagem READY: atribui missão ao rover.
 
         Prioriza missões manuais, depois automáticas.
         """
-        print(f"[NaveMae/ML] READY de rover {stream_id} (seq={header.seq})")
+        log.debug("[NaveMae/ML] READY de rover %s (seq=%s)", stream_id, header.seq)
 
         # Idempotência: reenvia resposta pendente se houver
         pending = self.ml_pending_mission.get(stream_id)
         if pending is not None:
-            try:
-                self.ml_sock.sendto(pending["reply_bytes"], addr)
-                print(f"[NaveMae/ML] Rover {stream_id} tem resposta pendente → reenviei")
-            except OSError:
-                pass
+            self._ml_send(pending["reply_bytes"], addr)
+            log.debug("[NaveMae/ML] Rover %s tem resposta pendente → reenviei", stream_id)
             return
 
         # Escolher missão: prioridade para manuais
@@ -281,43 +465,36 @@ class NaveMae:
         fila_manual = self.manual_missions.get(stream_id)
         if fila_manual:
             missao = fila_manual[0]  # Peek
-            print(f"[NaveMae/ML] Rover {stream_id}: usando missão MANUAL")
+            log.debug("[NaveMae/ML] Rover %s: usando missão MANUAL", stream_id)
         if missao is None:
             if self.scenario in (1, 2, 4):
                 missao = self.tarefas[0] if self.tarefas else None
             elif self.scenario == 3:
                 missao = self.criaTarefa(self.task_counter + 1)
             if missao:
-                print(f"[NaveMae/ML] Rover {stream_id}: usando missão AUTOMÁTICA (scenario {self.scenario})")
+                log.debug("[NaveMae/ML] Rover %s: usando missão AUTOMÁTICA (scenario %s)", stream_id, self.scenario)
 
         # Se não há missão → NOMISSION
         if missao is None:
             reply_seq = self._prox_seq_ml()
-            msg = ml.build_message(
-                msg_type=ml.TYPE_NOMISSION,
-                seq=reply_seq,
-                ack=header.seq,
-                stream_id=stream_id,
-                payload=b"",
-                flags=ml.FLAG_NEEDS_ACK,
-            )
-            try:
-                self.ml_sock.sendto(msg, addr)
-            except OSError:
-                pass
+            # Cópia imutável: a resposta fica guardada para reenvio
+            msg = bytes(ml.patch_template(self._nomission_template, reply_seq, header.seq, stream_id))
+            self._ml_send(msg, addr)
             self.ml_pending_mission[stream_id] = {
                 "mission_seq": None,
                 "reply_bytes": msg,
                 "missao": None,
             }
-            print(f"[NaveMae/ML] → NOMISSION para rover {stream_id}")
+            log.debug("[NaveMae/ML] → NOMISSION para rover %s", stream_id)
             return
 
         # Enviar MISSION
         mission_id, task_number, x, y, radius, duracao = missao
-        print(f"[NaveMae/ML] missão escolhida: idM={mission_id} TaskN={task_number} x={x} y={y} r={radius} d={duracao}")
+        log.debug(
+            "[NaveMae/ML] missão escolhida: idM=%s TaskN=%s x=%s y=%s r=%s d=%s",
+            mission_id, task_number, x, y, radius, duracao,
+        )
 
-        payload = ml.build_payload_mission(mission_id, task_number, x, y, radius, duracao)
         self.ml_estado[stream_id] = {
             "mission_id": mission_id,
             "task_number": task_number,
@@ -332,75 +509,56 @@ class NaveMae:
         except Exception:
             pass
 
+        # Aceita o PROGRESS v2 se o rover o anunciou no READY (rovers antigos enviam version=1)
+        versao = ml.VERSION_PROGRESS_V2 if header.version >= ml.VERSION_PROGRESS_V2 else ml.VERSION
+
         mission_seq = self._prox_seq_ml()
-        msg = ml.build_message(
-            msg_type=ml.TYPE_MISSION,
-            seq=mission_seq,
-            ack=header.seq,
-            stream_id=stream_id,
-            payload=payload,
-            flags=ml.FLAG_NEEDS_ACK,
-        )
-        try:
-            self.ml_sock.sendto(msg, addr)
-        except OSError:
-            pass
+        pre = self._mission_frames.get(missao)
+        if pre is not None:
+            # Missão fixa: frame pré-construído, só version/seq/ack/stream_id mudam
+            msg = bytes(ml.patch_template(pre, mission_seq, header.seq, stream_id, versao))
+        else:
+            msg = ml.build_frame_mission(
+                mission_seq, header.seq, stream_id,
+                mission_id, task_number, x, y, radius, duracao,
+                flags=ml.FLAG_NEEDS_ACK, version=versao,
+            )
+        self._ml_send(msg, addr)
         self.ml_pending_mission[stream_id] = {
             "mission_seq": mission_seq,
             "reply_bytes": msg,
             "missao": missao,
         }
-        print(f"[NaveMae/ML] → MISSION task={task_number} missao={mission_id} para rover {stream_id} (seq={mission_seq})")
+        log.debug(
+            "[NaveMae/ML] → MISSION task=%s missao=%s para rover %s (seq=%s)",
+            task_number, mission_id, stream_id, mission_seq,
+        )
 
     def _ml_handle_progress(self, stream_id: int, header: ml.MLHeader, payload: bytes, addr):
-        """Processa mensagem PROGRESS: atualiza estado e envia ACK."""
+        """Processa mensagem PROGRESS: atualiza estado e agenda o ACK (ver _ml_agendar_ack)."""
         try:
             info = ml.parse_payload_progress(payload)
         except ValueError as exc:
             print(f"[NaveMae/ML] PROGRESS inválido de rover {stream_id}: {exc}")
             return
 
-        mission_id = info["mission_id"]
+        mission_id = info.mission_id
         estado = self.ml_estado.get(stream_id)
         if not estado or estado.get("mission_id") != mission_id:
             print(f"[NaveMae/ML] PROGRESS fora de contexto de rover {stream_id}")
-            # Envia ACK mesmo assim
-            ack_msg = ml.build_message(
-                msg_type=ml.TYPE_ACK,
-                seq=self._prox_seq_ml(),
-                ack=header.seq,
-                stream_id=stream_id,
-                payload=b"",
-                flags=ml.FLAG_ACK_ONLY,
-            )
-            self.ml_sock.sendto(ack_msg, addr)
+            # ACK mesmo assim
+            self._ml_agendar_ack(stream_id, header.seq, addr)
             return
 
         if self._ml_is_duplicate(stream_id, header):
             print(f"[NaveMae/ML] PROGRESS duplicado de rover {stream_id}")
-            ack_msg = ml.build_message(
-                msg_type=ml.TYPE_ACK,
-                seq=self._prox_seq_ml(),
-                ack=header.seq,
-                stream_id=stream_id,
-                payload=b"",
-                flags=ml.FLAG_ACK_ONLY,
-            )
-            self.ml_sock.sendto(ack_msg, addr)
+            self._ml_agendar_ack(stream_id, header.seq, addr)
             return
 
         self.ml_estado[stream_id]["ultimo_progress"] = info
-        print(f"[NaveMae/ML] PROGRESS rover {stream_id}: {info['percent']}% bat={info['battery']}")
-
-        ack_msg = ml.build_message(
-            msg_type=ml.TYPE_ACK,
-            seq=self._prox_seq_ml(),
-            ack=header.seq,
-            stream_id=stream_id,
-            payload=b"",
-            flags=ml.FLAG_ACK_ONLY,
-        )
-        self.ml_sock.sendto(ack_msg, addr)
+        log.debug("[NaveMae/ML] PROGRESS rover %s: %s%% bat=%s", stream_id, info.percent, info.battery)
+
+        self._ml_agendar_ack(stream_id, header.seq, addr)
 
     def _ml_handle_done(self, stream_id: int, header: ml.MLHeader, payload: bytes, addr):
         """Processa mensagem DONE: marca missão como concluída e envia ACK."""
@@ -410,47 +568,47 @@ class NaveMae:
             print(f"[NaveMae/ML] DONE inválido de rover {stream_id}: {exc}")
             return
 
-        mission_id = info["mission_id"]
-        result_code = info["result_code"]
+        mission_id = info.mission_id
+        result_code = info.result_code
         estado = self.ml_estado.get(stream_id)
         if not estado or estado.get("mission_id") != mission_id:
             print(f"[NaveMae/ML] DONE fora de contexto de rover {stream_id}")
-            ack_msg = ml.build_message(
-                msg_type=ml.TYPE_ACK,
-                seq=self._prox_seq_ml(),
-                ack=header.seq,
-                stream_id=stream_id,
-                payload=b"",
-                flags=ml.FLAG_ACK_ONLY,
-            )
-            self.ml_sock.sendto(ack_msg, addr)
+            self._ml_enviar_ack(stream_id, header.seq, addr)
             return
 
         if self._ml_is_duplicate(stream_id, header) or estado.get("done"):
             print(f"[NaveMae/ML] DONE duplicado de rover {stream_id}")
-            ack_msg = ml.build_message(
-                msg_type=ml.TYPE_ACK,
-                seq=self._prox_seq_ml(),
-                ack=header.seq,
-                stream_id=stream_id,
-                payload=b"",
-                flags=ml.FLAG_ACK_ONLY,
-            )
-            self.ml_sock.sendto(ack_msg, addr)
+            self._ml_enviar_ack(stream_id, header.seq, addr)
             return
 
         estado["done"] = True
-        print(f"[NaveMae/ML] DONE rover {stream_id}: missao={mission_id} resultado={result_code}")
-
-        ack_msg = ml.build_message(
-            msg_type=ml.TYPE_ACK,
-            seq=self._prox_seq_ml(),
-            ack=header.seq,
-            stream_id=stream_id,
-            payload=b"",
-            flags=ml.FLAG_ACK_ONLY,
-        )
-        self.ml_sock.sendto(ack_msg, addr)
+        log.debug("[NaveMae/ML] DONE rover %s: missao=%s resultado=%s", stream_id, mission_id, result_code)
+
+        self._ml_enviar_ack(stream_id, header.seq, addr)
+
+    def _ml_handle_ack(self, stream_id: int, header: ml.MLHeader, payload: bytes, addr):
+        """Processa ACK do rover: confirma a MISSION/NOMISSION pendente e avança a fila de missões."""
+        log.debug("[NaveMae/ML] ACK de rover %s (ack=%s)", stream_id, header.ack)
+        pending = self.ml_pending_mission.get(stream_id)
+        if pending is None:
+            return
+        if pending["mission_seq"] is not None and header.ack == pending["mission_seq"]:
+            self.ml_pending_mission.pop(stream_id, None)
+            # Consome missão manual se aplicável
+            fila_manual = self.manual_missions.get(stream_id)
+            if fila_manual and pending["missao"] == fila_manual[0]:
+                fila_manual.popleft()
+                if not fila_manual:
+                    self.manual_missions.pop(stream_id, None)
+                print(f"[NaveMae/ML] ✅ Missão manual consumida da fila do rover {stream_id}")
+            # Avança cenário
+            if self.scenario in (2, 4):
+                if self.tarefas and pending["missao"] == self.tarefas[0]:
+                    self._mission_frames.pop(self.tarefas.popleft(), None)
+            elif self.scenario == 3:
+                self.task_counter += 1
+        elif pending["mission_seq"] is None:
+            self.ml_pending_mission.pop(stream_id, None)
 
     def iniciar(self):
         """Inicia todos os serviços: telemetria, MissionLink e WebSocket."""
@@ -459,18 +617,29 @@ class NaveMae:
         self.servidorSocket.bind((self.host, self.port))
         self.servidorSocket.listen()
         print(f"[NaveMae] a escutar em {self.host}:{self.port}")
-        threading.Thread(target=self._cicloAceitacao, daemon=True).start()
-        
+
         self.ml_sock.bind((self.host, self.ml_port))
         print(f"[NaveMae] a escutar ML (UDP) em {self.host}:{self.ml_port}")
-        self.ml_thread = threading.Thread(target=self._cicloML, daemon=True)
-        self.ml_thread.start()
+
+        self.loop_thread = threading.Thread(target=asyncio.run, args=(self._cicloPrincipal(),), daemon=True)
+        self.loop_thread.start()
 
         self.start_ws_server(host=self.host, port=2900)
 
     def parar(self):
         """Para todos os serviços e fecha conexões."""
         self.terminar = True
+        self._evento_dirty.set()  # acorda o _ws_loop_envio
+
+        loop, evento = self.loop, self._evento_parar
+        if loop is not None and evento is not None:
+            try:
+                loop.call_soon_threadsafe(evento.set)
+            except RuntimeError:
+                pass  # loop já terminou
+
+        if self.loop_thread and self.loop_thread.is_alive():
+            self.loop_thread.join(timeout=1.0)
 
         try:
             self.servidorSocket.shutdown(socket.SHUT_RDWR)
@@ -483,122 +652,99 @@ class NaveMae:
         except OSError:
             pass
 
-        if self.ml_thread and self.ml_thread.is_alive():
-            self.ml_thread.join(timeout=1.0)
+    def _fixarCPUs(self, cpus):
+        """
+        Fixa a thread atual (a do event loop) nas CPUs indicadas.
 
-    def _cicloAceitacao(self):
-        """Loop para aceitar conexões TCP de rovers."""
-        while not self.terminar:
-            try:
-                conn, addr = self.servidorSocket.accept()
-            except OSError:
-                break
-            threading.Thread(target=self._cicloCliente, args=(conn, addr), daemon=True).start()
-            print(f"[NaveMae] ligação de {addr}")
-
-    def _cicloCliente(self, conn: socket.socket, addr: Tuple[str, int]):
-        """Loop para processar frames de um cliente TCP."""
-        with conn:
-            conn.settimeout(1.0)
-            while not self.terminar:
-                cabecalho = self._receberExacto(conn, ts.HEADER_SIZE)
-                if not cabecalho:
-                    break
-                try:
-                    cabecalhoLido = ts.lerHeader(cabecalho)
-                    dadosPayload = self._receberExacto(conn, cabecalhoLido.payload_len)
-                    if dadosPayload is None:
-                        break
-                    frame = ts.decodificarFrame(cabecalho, dadosPayload)
-                    self._imprimir(frame, addr)
-                except Exception as exc:
-                    print(f"[NaveMae] erro {addr}: {exc}")
-                    break
-        print(f"[NaveMae] ligação terminada {addr}")
+        Útil para a manter no mesmo nó NUMA que as interrupções da placa de rede
+        (ver /proc/irq/<irq>/smp_affinity_list). Só existe em Linux; noutros
+        sistemas, ou com CPUs inválidas, apenas avisa e continua.
+        """
+        try:
+            os.sched_setaffinity(0, cpus)  # 0 = thread que faz a chamada
+            print(f"[NaveMae] event loop fixado nas CPUs {sorted(cpus)}")
+        except (AttributeError, OSError, ValueError) as exc:
+            print(f"[NaveMae] não foi possível fixar CPUs {sorted(cpus)}: {exc}")
 
-    def _receberExacto(self, conn: socket.socket, n: int) -> Optional[bytes]:
-        """Recebe exatamente n bytes do socket."""
-        data = bytearray()
-        while len(data) < n and not self.terminar:
-            try:
-                chunk = conn.recv(n - len(data))
-            except socket.timeout:
-                continue
-            if not chunk:
-                return None
-            data.extend(chunk)
-        return bytes(data) if len(data) == n else None
+    async def _cicloPrincipal(self):
+        """
+        Event loop da telemetria (TCP) e do MissionLink (UDP).
+
+        Usa os sockets já criados e ligados em __init__/iniciar e corre até parar() sinalizar _evento_parar.
+        """
+        self._evento_parar = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        if self.terminar:
+            return
+        if self.cpus:
+            self._fixarCPUs(self.cpus)
+
+        servidor = await self.loop.create_server(lambda: _TSProtocolo(self), sock=self.servidorSocket)
+        self.ml_transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: _MLProtocolo(self), sock=self.ml_sock
+        )
+        print("[NaveMae/ML] Loop MissionLink iniciado.")
+        try:
+            await self._evento_parar.wait()
+        finally:
+            self.ml_transport.close()
+            servidor.close()
+            for transport in list(self._clientes_ts):
+                transport.close()
+            await asyncio.sleep(0)  # deixa correr os connection_lost agendados pelo close()
+            await servidor.wait_closed()
 
     def _imprimir(self, frame: ts.Frame, addr: Tuple[str, int]):
         """Processa e imprime dados de um frame TS, atualizando rovers."""
         hdr, pl = frame.header, frame.payload
-        origem = f"{addr[0]}:{addr[1]}"
         tipo = hdr.tipo
-        if tipo in (ts.TYPE_HELLO, 1):
-            print(f"[NaveMae] Rover {hdr.id_rover} ligou-se à nave ({origem})")
-            return
         if tipo == ts.TYPE_INFO:
-            print(f"[NaveMae] Recebi Rover {hdr.id_rover}")
+            log.debug("[NaveMae] Recebi Rover %s", hdr.id_rover)
             realIndex = hdr.id_rover - 1
-            self.rovers[realIndex].updateInfo(
+            rover = self.rovers[realIndex]
+            rover.updateInfo(
                 hdr.pos_x, hdr.pos_y, hdr.pos_z, (pl.x, pl.y, pl.z),
                 pl.velocidade, pl.direcao, hdr.bateria, hdr.state,
                 pl.proc_use, pl.storage, pl.sensores, hdr.freq,
-                self.rovers[realIndex].missao, pl.progresso
+                rover.missao, pl.progresso
             )
+            if rover.dirty:
+                self._evento_dirty.set()
+            return
+        origem = f"{addr[0]}:{addr[1]}"
+        if tipo in (ts.TYPE_HELLO, 1):
+            print(f"[NaveMae] Rover {hdr.id_rover} ligou-se à nave ({origem})")
             return
         if tipo in (ts.TYPE_END, ts.TYPE_FIN, 3):
             print(f"[NaveMae] Rover {hdr.id_rover} desligou-se da nave ({origem})")
             return
         print(ts.frameParaTexto(frame, origem=origem))
 
-    def _cicloML(self):
-        """Loop principal para processar mensagens MissionLink via UDP."""
-        print("[NaveMae/ML] Loop MissionLink iniciado.")
-        while not self.terminar:
-            try:
-                data, addr = self.ml_sock.recvfrom(4096)
-            except OSError:
-                break
-            try:
-                header, payload = ml.parse_message(data)
-            except ValueError as exc:
-                print(f"[NaveMae/ML] mensagem inválida de {addr}: {exc}")
-                continue
+    def _processarML(self, data: bytes, addr):
+        """Processa um datagrama MissionLink recebido (chamado pelo event loop)."""
+        try:
+            header, payload = ml.parse_message(data)
+        except ValueError as exc:
+            print(f"[NaveMae/ML] mensagem inválida de {addr}: {exc}")
+            return
 
-            sid = header.stream_id
-            msg_type = header.msg_type
-
-            if msg_type == ml.TYPE_READY:
-                self._ml_handle_ready(sid, header, addr)
-            elif msg_type == ml.TYPE_PROGRESS:
-                self._ml_handle_progress(sid, header, payload, addr)
-            elif msg_type == ml.TYPE_DONE:
-                self._ml_handle_done(sid, header, payload, addr)
-            elif msg_type == ml.TYPE_ACK:
-                print(f"[NaveMae/ML] ACK de rover {sid} (ack={header.ack})")
-                pending = self.ml_pending_mission.get(sid)
-                if pending is None:
-                    continue
-                if pending["mission_seq"] is not None and header.ack == pending["mission_seq"]:
-                    self.ml_pending_mission.pop(sid, None)
-                    # Consome missão manual se aplicável
-                    fila_manual = self.manual_missions.get(sid)
-                    if fila_manual and pending["missao"] == fila_manual[0]:
-                        fila_manual.pop(0)
-                        if not fila_manual:
-                            self.manual_missions.pop(sid, None)
-                        print(f"[NaveMae/ML] ✅ Missão manual consumida da fila do rover {sid}")
-                    # Avança cenário
-                    if self.scenario in (2, 4):
-                        if self.tarefas and pending["missao"] == self.tarefas[0]:
-                            self.tarefas.pop(0)
-                    elif self.scenario == 3:
-                        self.task_counter += 1
-                elif pending["mission_seq"] is None:
-                    self.ml_pending_mission.pop(sid, None)
-            else:
-                print(f"[NaveMae/ML] tipo de mensagem desconhecido: {msg_type} de rover {sid}")
+        handler = self._ml_dispatch.get(header.msg_type)
+        if handler is None:
+            print(f"[NaveMae/ML] tipo de mensagem desconhecido: {header.msg_type} de rover {header.stream_id}")
+            return
+        handler(header.stream_id, header, payload, addr)
+
+    def _preconstruirMissoes(self):
+        """
+        Pré-constrói o frame MISSION de cada tarefa da lista fixa (cenários 2 e 4).
+
+        Os frames ficam com seq/ack/stream_id a zero; _ml_handle_ready só reescreve esses
+        campos. Cada entrada é removida quando a respetiva tarefa é consumida.
+        """
+        self._mission_frames = {
+            missao: bytearray(ml.build_frame_mission(0, 0, 0, *missao, flags=ml.FLAG_NEEDS_ACK))
+            for missao in self.tarefas
+        }
 
     def gerar_tarefas(self, scenario: int):
         """
@@ -607,22 +753,25 @@ class NaveMae:
         Parâmetros:
             scenario (int): Cenário (1-4).
         """
-        self.tarefas = []
+        self.tarefas = deque()
+        self._mission_frames = {}
         if scenario == 1:
             return
         elif scenario == 2:
             self.tarefas.append(self.criaTarefa(1))
             self.tarefas.append(self.criaTarefa(2))
+            self._preconstruirMissoes()
             return
         elif scenario == 3:
             return  # Infinito
         elif scenario == 4:
-            self.tarefas = [
+            self.tarefas = deque([
                 (1, 1, 2, 2, 2.0, 30),
                 (2, 2, 8, 3, 2.0, 35),
                 (3, 3, 12, 10, 2.0, 40),
                 (4, 4, 5, 12, 2.0, 45),
-            ]
+            ])
+            self._preconstruirMissoes()
             return
         else:
             raise ValueError("Scenario inválido")
@@ -632,9 +781,17 @@ if __name__ == "__main__":
     parser.add_argument("--host", default="0.0.0.0", help="endereço de escuta")
     parser.add_argument("--port", type=int, default=6000, help="port TCP para telemetria")
     parser.add_argument("--scenario", type=int, choices=[1, 2, 3, 4], default=3, help="cenário de missões (1-4)")
+    parser.add_argument("--cpus", default=None, help="CPUs para o event loop TCP/UDP, ex.: 2,3 (só Linux)")
+    parser.add_argument("--verbose", action="store_true", help="mostra as mensagens por pacote (nível DEBUG)")
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.verbose:
+        # Só o logger da nave; o root fica em INFO (sem o debug interno do asyncio, etc.)
+        log.setLevel(logging.DEBUG)
     roversN = 3
     nave = NaveMae(roversN, args.host, args.port)
+    if args.cpus:
+        nave.cpus = {int(c) for c in args.cpus.split(",")}
 
     nave.scenario = args.scenario
     nave.gerar_tarefas(nave.scenario)
@@ -159,6 +159,8 @@ class RoverAPI:
                     (self.hostNaveMae, self.portoNaveMae),
                     timeout=2.0
                 )
+                # Um frame TS por write: desativa Nagle para não atrasar o frame seguinte
+                self.socketLigacao.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                 self.streamLigacao = self.socketLigacao.makefile("rwb", buffering=0)
                 return
             except OSError:
@@ -197,9 +199,10 @@ class RoverAPI:
         # Envia HELLO no arranque
         self._enviarDados(ts.codificarFrame(ts.TYPE_HELLO, self.rover, freq_hz))
 
+        codificarInfo = ts.criarCodificador(ts.TYPE_INFO, self.rover.id, freq_hz)
         while not self.eventoParar.is_set():
             self.rover.iterar()
-            self._enviarDados(ts.codificarFrame(ts.TYPE_INFO, self.rover, freq_hz))
+            self._enviarDados(codificarInfo(self.rover))
             time.sleep(self.rover.tick)
 
     # ---------- MissionLink (UDP) ----------
@@ -237,6 +240,7 @@ class RoverAPI:
                         stream_id=self.ml_stream_id,
                         payload=b"",
                         flags=ml.FLAG_NEEDS_ACK,
+                        version=ml.VERSION_PROGRESS_V2,  # anuncia suporte a PROGRESS v2
                     )
 
                     try:
@@ -303,11 +307,17 @@ class RoverAPI:
 
                         print(f"[Rover {self.rover.id}] recebi missão: {miss}")
 
-                        mission_id = miss["mission_id"]
-                        x = miss["x"]
-                        y = miss["y"]
-                        radius = miss["radius"]
-                        duracao = miss["duracao"]   # ML já tem este campo
+                        # A Nave-Mãe aceitou o PROGRESS v2 se respondeu nessa versão
+                        if header.version >= ml.VERSION_PROGRESS_V2:
+                            build_progress, versao_progress = ml.build_payload_progress_v2, ml.VERSION_PROGRESS_V2
+                        else:
+                            build_progress, versao_progress = ml.build_payload_progress, ml.VERSION
+
+                        mission_id = miss.mission_id
+                        x = miss.x
+                        y = miss.y
+                        radius = miss.radius
+                        duracao = miss.duracao   # ML já tem este campo
 
                         # Atualizar destino do Rover com base na missão (Z mantém-se)
                         self.rover.destino = (x, y, self.rover.pos_z)
@@ -353,7 +363,9 @@ class RoverAPI:
                             dist = (dx * dx + dy * dy) ** 0.5
 
                             # Construir PROGRESS com o estado atual
-                            progress_payload = ml.build_payload_progress(
+                            # (v2: x/y saturam em ml.MAX_ARENA_XY; os destinos da
+                            #  Nave-Mãe estão limitados a esse intervalo)
+                            progress_payload = build_progress(
                                 mission_id=mission_id,
                                 status=0,                # 0 = em curso
                                 percent=percent,
@@ -370,6 +382,7 @@ class RoverAPI:
                                 stream_id=self.ml_stream_id,
                                 payload=progress_payload,
                                 flags=ml.FLAG_NEEDS_ACK,
+                                version=versao_progress,
                             )
 
                             try:
@@ -468,10 +481,11 @@ if __name__ == "__main__":
     freq_hz = int(1 / rover_api.rover.tick) if rover_api.rover.tick > 0 else 0
     print(f"[Rover {args.id}] a enviar telemetria para {args.host}:{args.port} destino={args.dest} vel={args.vel}")
     rover_api._enviarDados(ts.codificarFrame(ts.TYPE_HELLO, rover_api.rover, freq_hz))
+    codificarInfo = ts.criarCodificador(ts.TYPE_INFO, rover_api.rover.id, freq_hz)
     try:
         while True:
             rover_api.rover.iterar()
-            rover_api._enviarDados(ts.codificarFrame(ts.TYPE_INFO, rover_api.rover, freq_hz))
+            rover_api._enviarDados(codificarInfo(rover_api.rover))
             time.sleep(rover_api.rover.tick)
     except KeyboardInterrupt:
         pass
@@ -1,6 +1,7 @@
 import struct
 import zlib
 from dataclasses import dataclass
+from functools import partial
 from typing import Optional as Optimal
 from typing import Tuple
 
@@ -9,16 +10,25 @@ TYPE_INFO = 2
 TYPE_END = 3
 TYPE_FIN = 4
 
+_NOMES_TIPO = {TYPE_HELLO: "HELLO", TYPE_INFO: "INFO", TYPE_END: "END", TYPE_FIN: "FIN"}
+
 HEADER_FMT = ">BBBBBBBIIB"  # 7 bytes + 4 + 4 + 1 = 16
 HEADER_SIZE = struct.calcsize(HEADER_FMT)
+PAYLOAD_FMT = ">BBBBBBBBB"
 PAYLOAD_SIZE = 9  #proc_use, storage, velocidade, direcao, sensores
 
+# Formatos pré-compilados (evita reinterpretar a string de formato em cada frame)
+_HDR = struct.Struct(HEADER_FMT)
+_PL = struct.Struct(PAYLOAD_FMT)
+
 
 def limitarByte(valor: float) -> int:
-    return max(0, min(255, int(valor)))
+    v = int(valor)
+    return 0 if v < 0 else (255 if v > 255 else v)  # sem max()/min(): chamado ~15x por frame
 
 
-@dataclass
+# slots=True: sem __dict__ por instância; construção e leitura de atributos mais rápidas
+@dataclass(slots=True)
 class Header:
     tipo: int
     id_rover: int
@@ -32,7 +42,7 @@ class Header:
     freq: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Payload:
     proc_use: int
     storage: int
@@ -45,101 +55,135 @@ class Payload:
     z: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Frame:
     header: Header
     payload: Payload
 
 
-def criarPayloadDoRover(rover) -> Payload:
-    return Payload(
-        proc_use=limitarByte(rover.proc_use),
-        storage=limitarByte(rover.storage),
-        velocidade=limitarByte(rover.velocidade),
-        direcao=limitarByte(rover.direcao),
-        sensores=limitarByte(rover.sensores),
-        progresso=limitarByte(rover.progresso),
-        x=limitarByte(rover.destino[0]),
-        y=limitarByte(rover.destino[1]),
-        z=limitarByte(rover.destino[2]),
+# Layout do frame TS, partilhado por codificarFrame e criarCodificador. t, i e f (tipo,
+# id do rover e freq) chegam já limitados a um byte; os _* por omissão não são passados.
+def _empacotarFrame(t: int, i: int, f: int, rover, _lb=limitarByte, _pl_into=_PL.pack_into,
+                    _hdr_into=_HDR.pack_into, _crc=zlib.crc32,
+                    _hsz=HEADER_SIZE, _psz=PAYLOAD_SIZE) -> bytes:
+    # Empacota diretamente dos atributos do rover, sem objetos Payload/Header intermédios.
+    # Frame inteiro num só buffer: payload primeiro (o checksum do header depende dele)
+    buf = bytearray(_hsz + _psz)
+    destino = rover.destino
+    _pl_into(
+        buf, _hsz,
+        _lb(rover.proc_use),
+        _lb(rover.storage),
+        _lb(rover.velocidade),
+        _lb(rover.direcao),
+        _lb(rover.sensores),
+        _lb(rover.progresso),
+        _lb(destino[0]),
+        _lb(destino[1]),
+        _lb(destino[2]),
     )
+    checksum = _crc(memoryview(buf)[_hsz:])  # já é uint32 em Python 3, sem máscara
+    _hdr_into(
+        buf, 0,
+        t,
+        i,
+        _lb(rover.bateria),
+        _lb(rover.pos_x),
+        _lb(rover.pos_y),
+        _lb(rover.pos_z),
+        _lb(rover.state),
+        checksum,
+        _psz,
+        f,
+    )
+    return bytes(buf)
 
 
 def codificarFrame(tipo: int, rover, freq: int) -> bytes:
-    payload_obj = criarPayloadDoRover(rover)
-    payload_bytes = struct.pack(
-        ">BBBBBBBBB",
-        payload_obj.proc_use,
-        payload_obj.storage,
-        payload_obj.velocidade,
-        payload_obj.direcao,
-        payload_obj.sensores,
-        payload_obj.progresso,
-        payload_obj.x,
-        payload_obj.y,
-        payload_obj.z
-    )
-    payload_len = len(payload_bytes)
-    checksum = zlib.crc32(payload_bytes) & 0xFFFFFFFF
-
-    header = Header(
-        tipo=limitarByte(tipo),
-        id_rover=limitarByte(rover.id),
-        bateria=limitarByte(rover.bateria),
-        pos_x=limitarByte(rover.pos_x),
-        pos_y=limitarByte(rover.pos_y),
-        pos_z=limitarByte(rover.pos_z),
-        state=limitarByte(rover.state),
-        checksum=checksum,
-        payload_len=payload_len,
-        freq=limitarByte(freq),
-    )
-    header_bytes = struct.pack(
-        HEADER_FMT,
-        header.tipo,
-        header.id_rover,
-        header.bateria,
-        header.pos_x,
-        header.pos_y,
-        header.pos_z,
-        header.state,
-        header.checksum,
-        header.payload_len,
-        header.freq,
-    )
-    return header_bytes + payload_bytes
+    return _empacotarFrame(limitarByte(tipo), limitarByte(rover.id), limitarByte(freq), rover)
+
+
+# Codificadores especializados por (tipo, id do rover, freq): estes três valores não
+# mudam durante o ciclo de envio, por isso são limitados uma vez e fixados no partial.
+_codificadores = {}
 
 
-def lerHeader(buf: bytes) -> Header:
-    if len(buf) != HEADER_SIZE:
-        raise ValueError(f"Header length inválido: {len(buf)} != {HEADER_SIZE}")
-    fields = struct.unpack(HEADER_FMT, buf)
-    return Header(*fields)
+def criarCodificador(tipo: int, rover_id: int, freq: int):
+    """
+    Devolve uma função enc(rover) -> bytes equivalente a codificarFrame(tipo, rover, freq)
+    para o rover com este id (o id do rover passado a enc não é lido).
+    """
+    chave = (tipo, rover_id, freq)
+    enc = _codificadores.get(chave)
+    if enc is None:
+        enc = partial(_empacotarFrame, limitarByte(tipo), limitarByte(rover_id), limitarByte(freq))
+        _codificadores[chave] = enc
+    return enc
 
 
-def lerPayload(buf: bytes) -> Payload:
-    if len(buf) < PAYLOAD_SIZE:
+# Os argumentos _* por omissão ligam constantes e funções a variáveis locais
+# (LOAD_FAST em vez de LOAD_GLOBAL + atributo em cada frame); não os passar.
+def lerHeader(buf: bytes, _hsz=HEADER_SIZE, _unpack=_HDR.unpack, _H=Header) -> Header:
+    if len(buf) != _hsz:
+        raise ValueError(f"Header length inválido: {len(buf)} != {_hsz}")
+    return _H(*_unpack(buf))
+
+
+def lerPayload(buf: bytes, _psz=PAYLOAD_SIZE, _unpack_from=_PL.unpack_from, _P=Payload) -> Payload:
+    if len(buf) < _psz:
         raise ValueError("Payload demasiado curto")
-    vals = struct.unpack(">BBBBBBBBB", buf[:PAYLOAD_SIZE])
-    return Payload(*vals)
+    return _P(*_unpack_from(buf, 0))
 
 
+# Aceita bytes, bytearray ou memoryview: unpack/unpack_from e crc32 leem pelo buffer
+# protocol, por isso memoryviews de um buffer de receção não são copiadas.
 def decodificarFrame(header_bytes: bytes, payload_bytes: bytes) -> Frame:
     hdr = lerHeader(header_bytes)
     if hdr.payload_len != len(payload_bytes):
         raise ValueError(f"Tamanho do payload não corresponde: header={hdr.payload_len} real={len(payload_bytes)}")
-    calc = zlib.crc32(payload_bytes) & 0xFFFFFFFF
+    calc = zlib.crc32(payload_bytes)
     if calc != hdr.checksum:
         raise ValueError("Checksum inválido")
     payload = lerPayload(payload_bytes)
     return Frame(hdr, payload)
 
 
+# Decodifica o frame que começa em buf[pos] (tipicamente memoryview(buf_rececao)),
+# considerando válidos só os bytes até fim (por omissão len(buf)). Devolve None se o
+# frame ainda não estiver completo, para o chamador esperar por mais bytes sem ter de
+# ler o header à parte. Lê header e payload com unpack_from no offset, sem fatiar; só
+# o crc32 recebe uma memoryview do payload (que partilha a memória de buf).
+def decodificarFrameEm(buf, pos: int = 0, fim: Optimal[int] = None,
+                       _hsz=HEADER_SIZE, _psz=PAYLOAD_SIZE, _hdr_from=_HDR.unpack_from,
+                       _pl_from=_PL.unpack_from, _crc=zlib.crc32,
+                       _H=Header, _P=Payload, _F=Frame) -> Optimal[Frame]:
+    if fim is None:
+        fim = len(buf)
+    # Valida sobre o tuplo cru; Header/Payload só são criados para frames completos e válidos
+    campos = _hdr_from(buf, pos)
+    payload_len = campos[8]
+    ini = pos + _hsz
+    fimFrame = ini + payload_len
+    if payload_len < _psz:
+        raise ValueError(f"Tamanho do payload não corresponde: header={payload_len} mínimo={_psz}")
+    if fimFrame > fim:
+        return None
+    if _crc(memoryview(buf)[ini:fimFrame]) != campos[7]:
+        raise ValueError("Checksum inválido")
+    return _F(_H(*campos), _P(*_pl_from(buf, ini)))
+
+
+# Só (tipo, id_rover, payload_len, checksum), sem criar Header: para quem apenas
+# encaminha frames (por tipo/rover) e não precisa dos restantes campos.
+def peekHeader(buf, pos: int = 0, _hdr_from=_HDR.unpack_from) -> Tuple[int, int, int, int]:
+    tipo, id_rover, _b, _x, _y, _z, _s, checksum, payload_len, _f = _hdr_from(buf, pos)
+    return tipo, id_rover, payload_len, checksum
+
+
 def frameParaTexto(frame: Frame, origem: Optimal[str] = None) -> str:
     cabecalho, payload = frame.header, frame.payload
-    nomeTipo = {TYPE_HELLO: "HELLO", TYPE_INFO: "INFO", TYPE_END: "END", TYPE_FIN: "FIN"}.get(
-        cabecalho.tipo, str(cabecalho.tipo)
-    )
+    tipo = cabecalho.tipo
+    nomeTipo = _NOMES_TIPO.get(tipo) or str(tipo)
     origemTxt = f" {origem}" if origem else ""
     return (
         f"[TS{origemTxt}] tipo={nomeTipo} id={cabecalho.id_rover} freq={cabecalho.freq}/s "